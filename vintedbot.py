@@ -1,5 +1,6 @@
 import asyncio
 import aiohttp
+from yarl import URL
 import json
 import logging
 import os
@@ -11,7 +12,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Set, Optional, Tuple, Any, Callable
 from dataclasses import dataclass, field, asdict
 from enum import Enum
-import hashlib
+import functools
 import time
 import random
 from urllib.parse import urlencode, quote, urlparse
@@ -22,6 +23,27 @@ import threading
 from concurrent.futures import ThreadPoolExecutor
 import traceback
 
+try:
+    import orjson
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 class ColoredFormatter(logging.Formatter):
     COLORS = {
         'DEBUG': '\033[36m',
@@ -59,6 +81,8 @@ def setup_logging(log_level=logging.INFO, log_file='vinted_bot.log'):
 
 logger = setup_logging(log_level=logging.DEBUG)
 
+_SIZE_SPLIT = re.compile(r'\s*/\s*')
+
 @dataclass
 class SearchFilters:
     query: str
@@ -66,22 +90,32 @@ class SearchFilters:
     gender: Optional[str] = None
     category: str = "Clothing"
     max_days_old: int = 0
-    
+
+    def __post_init__(self):
+        self._sizes_upper = frozenset(size.upper() for size in self.sizes)
+
+        params = {
+            'order': 'newest_first',
+            'search_text': self.query
+        }
+
+        if self.category == "Clothing":
+            if self.gender == "Men":
+                params['catalog_ids'] = '5'
+            elif self.gender == "Women":
+                params['catalog_ids'] = '1'
+
+        self._base_query = urlencode(params, quote_via=quote)
+
     def matches_item(self, item: Dict) -> Tuple[bool, str]:
-        if self.category == "Clothing" and self.sizes:
+        if self.category == "Clothing" and self._sizes_upper:
             item_size = item.get('size_title', '').strip().upper()
             if not item_size:
                 return False, f"Size mismatch: {item_size}"
-            
-            size_match = False
-            for target_size in self.sizes:
-                if target_size.upper() == item_size or target_size.upper() in item_size.split(' / '):
-                    size_match = True
-                    break
-            
-            if not size_match:
+
+            if item_size not in self._sizes_upper and self._sizes_upper.isdisjoint(_SIZE_SPLIT.split(item_size)):
                 return False, f"Size mismatch: {item_size}"
-        
+
         return True, "All filters matched"
 
 @dataclass
@@ -114,11 +148,13 @@ class SearchConfig:
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'SearchConfig':
+        filters_data = data['filters']
+        category = filters_data.get('category', 'Clothing')
         filters = SearchFilters(
-            query=data['filters']['query'],
-            sizes=data['filters'].get('sizes', []),
-            gender=data['filters'].get('gender') if data['filters'].get('category', 'Clothing') == 'Clothing' else None,
-            category=data['filters'].get('category', 'Clothing')
+            query=filters_data['query'],
+            sizes=filters_data.get('sizes', []),
+            gender=filters_data.get('gender') if category == 'Clothing' else None,
+            category=category
         )
         
         return cls(
@@ -135,12 +171,21 @@ class SearchConfig:
 class RateLimiter:
     def __init__(self):
         self.requests = defaultdict(deque)
-        self.lock = threading.Lock()
-    
-    def can_request(self, endpoint: str, max_requests: int = 60, window_seconds: int = 60) -> bool:
+        self.next_allowed: Dict[str, float] = {}
+        self.lock = asyncio.Lock()
+
+    async def wait(self, endpoint: str, min_gap: float):
+        now = time.monotonic()
+        next_at = self.next_allowed.get(endpoint, now)
+        self.next_allowed[endpoint] = max(next_at, now) + min_gap
+
+        if next_at > now:
+            await asyncio.sleep(next_at - now)
+
+    async def can_request(self, endpoint: str, max_requests: int = 60, window_seconds: int = 60) -> bool:
         current_time = time.time()
-        
-        with self.lock:
+
+        async with self.lock:
             endpoint_requests = self.requests[endpoint]
             
             while endpoint_requests and current_time - endpoint_requests[0] >= window_seconds:
@@ -152,13 +197,66 @@ class RateLimiter:
             endpoint_requests.append(current_time)
             return True
 
+class SentItemsStore:
+    def __init__(self, db_path: str = 'sent.db'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=OFF')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS sent (id INTEGER PRIMARY KEY)')
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def filter_new(self, item_ids: List[int]) -> Set[int]:
+        if not item_ids:
+            return set()
+
+        with self.lock:
+            placeholders = ','.join('?' * len(item_ids))
+            rows = self.conn.execute(
+                f'SELECT id FROM sent WHERE id IN ({placeholders})', item_ids
+            ).fetchall()
+            seen = {row[0] for row in rows}
+
+            new_ids = {item_id for item_id in item_ids if item_id not in seen}
+            if new_ids:
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO sent VALUES (?)',
+                    [(item_id,) for item_id in new_ids]
+                )
+                self.conn.commit()
+
+            return new_ids
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, tokens: float = 1):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return
+
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
 class SessionManager:
     def __init__(self, country_code: str = '.hu'):
         self.country_code = country_code
         self.base_url = f"https://www.vinted{country_code}"
         self.api_base = f"https://www.vinted{country_code}/api/v2"
         self.session = None
-        self.cookies = {}
         self.headers = self.get_default_headers()
         self.last_cookie_refresh = 0
         self.session_lock = asyncio.Lock()
@@ -185,13 +283,19 @@ class SessionManager:
     def get_session(self) -> aiohttp.ClientSession:
         if self.session is None or self.session.closed:
             timeout = aiohttp.ClientTimeout(total=30, connect=10)
-            connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=10,
+                ttl_dns_cache=600,
+                keepalive_timeout=75,
+                enable_cleanup_closed=True
+            )
             self.headers = self.get_default_headers()
             self.session = aiohttp.ClientSession(
                 timeout=timeout,
                 connector=connector,
                 headers=self.headers,
-                cookies=self.cookies
+                json_serialize=_json_dumps
             )
         return self.session
     
@@ -201,9 +305,8 @@ class SessionManager:
                 session = self.get_session()
                 async with session.get(self.base_url) as response:
                     if response.status == 200:
-                        self.cookies.update(session.cookie_jar._cookies)
                         self.last_cookie_refresh = time.time()
-                        logger.debug(f"Refreshed cookies: {len(self.cookies)} cookies")
+                        logger.debug(f"Refreshed cookies: {len(session.cookie_jar)} cookies in jar")
                     else:
                         logger.warning(f"Failed to refresh cookies: {response.status}")
             except Exception as e:
@@ -217,26 +320,21 @@ class SessionManager:
                     await self.session.close()
                 
                 self.session = None
-                self.cookies = {}
                 self.headers = self.get_default_headers()
                 self.last_cookie_refresh = 0
-                
+
                 session = self.get_session()
                 async with session.get(self.base_url) as response:
                     if response.status == 200:
-                        self.cookies.update(session.cookie_jar._cookies)
                         self.last_cookie_refresh = time.time()
-                        logger.info(f"Session recreated successfully with {len(self.cookies)} cookies")
+                        logger.info(f"Session recreated successfully with {len(session.cookie_jar)} cookies")
                     else:
                         logger.warning(f"Failed to recreate session: {response.status}")
             except Exception as e:
                 logger.error(f"Session recreation error: {e}")
     
-    def get_headers(self, referer: str = None) -> Dict[str, str]:
-        headers = self.headers.copy()
-        if referer:
-            headers['Referer'] = referer
-        return headers
+    def get_headers(self, referer: str = None) -> Optional[Dict[str, str]]:
+        return {'Referer': referer} if referer else None
     
     async def close(self):
         if self.session and not self.session.closed:
@@ -250,36 +348,40 @@ class VintedAPI:
             'search': '/catalog/items',
             'item': '/items/{item_id}',
         }
+        self._search_urls: Dict[str, URL] = {}
+
+    async def _iter_items(self, response: aiohttp.ClientResponse):
+        if ijson is not None:
+            async for item in ijson.items_async(response.content, 'items.item'):
+                yield item
+        else:
+            data = await response.json(loads=_json_loads)
+            for item in data.get('items', []):
+                yield item
+
+    def _search_url(self, filters: SearchFilters) -> URL:
+        base_url = self._search_urls.get(filters._base_query)
+        if base_url is None:
+            base_url = URL(
+                f"{self.session_manager.api_base}{self.api_endpoints['search']}?{filters._base_query}"
+            )
+            self._search_urls[filters._base_query] = base_url
+        return base_url
     
     async def search(self, filters: SearchFilters, page: int = 1, per_page: int = 20) -> List[Dict]:
-        if not self.rate_limiter.can_request('search', max_requests=20, window_seconds=60):
+        if not await self.rate_limiter.can_request('search', max_requests=20, window_seconds=60):
             logger.warning("Rate limit reached for search")
             await asyncio.sleep(random.uniform(5, 10))
             return []
         
-        params = {
-            'page': str(page),
-            'per_page': str(per_page),
-            'order': 'newest_first',
-            'search_text': filters.query
-        }
-        
-        if filters.category == "Clothing":
-            if filters.gender == "Men":
-                params['catalog_ids'] = '5'
-            elif filters.gender == "Women":
-                params['catalog_ids'] = '1'
-        
-        url = f"{self.session_manager.api_base}{self.api_endpoints['search']}"
-        query_string = urlencode(params, quote_via=quote)
-        full_url = f"{url}?{query_string}"
+        full_url = self._search_url(filters).update_query(page=page, per_page=per_page)
         
         try:
             if time.time() - self.session_manager.last_cookie_refresh > 60:
                 await self.session_manager.refresh_cookies()
             
-            await asyncio.sleep(random.uniform(0.5, 2))
-            
+            await self.rate_limiter.wait('search', random.uniform(0.5, 2))
+
             session = self.session_manager.get_session()
             headers = self.session_manager.get_headers(referer=f"{self.session_manager.base_url}/catalog")
             
@@ -289,18 +391,21 @@ class VintedAPI:
                 logger.debug(f"Search response status: {response.status}")
                 
                 if response.status == 200:
-                    data = await response.json()
-                    items = data.get('items', [])
-                    logger.info(f"Found {len(items)} items for query: {filters.query}")
-                    
                     filtered_items = []
-                    for item in items:
+                    item_count = 0
+
+                    async for item in self._iter_items(response):
+                        item_count += 1
                         matches, reason = filters.matches_item(item)
                         if matches:
                             filtered_items.append(item)
                         else:
                             logger.debug(f"Item filtered out: {reason}")
-                    
+
+                        if item_count % 50 == 0:
+                            await asyncio.sleep(0)
+
+                    logger.info(f"Found {item_count} items for query: {filters.query}")
                     logger.info(f"After filtering: {len(filtered_items)} items")
                     return filtered_items
                 
@@ -328,13 +433,76 @@ class VintedAPI:
             logger.error(f"Search error: {e}")
             return []
 
+@functools.lru_cache(maxsize=1024)
+def _format_item_message(item_id, title, amount, currency_code, size, brand,
+                         condition, user_login, photo_url, base_url) -> str:
+    url = f"{base_url}/items/{item_id}"
+
+    message = f"<b>{title}</b>\n"
+    message += f"💰 Price: {amount} {currency_code}\n"
+    message += f"📏 Size: {size}\n"
+    message += f"🏷️ Brand: {brand}\n"
+    message += f"⚡ Condition: {condition}\n"
+    message += f"👤 Seller: {user_login}\n"
+    message += f"🔗 <a href='{url}'>View Item</a>\n"
+
+    if photo_url:
+        message += f"📸 <a href='{photo_url}'>Photo</a>\n"
+
+    return message
+
 class TelegramNotifier:
     def __init__(self, token: str, country_code: str = '.hu'):
         self.token = token
         self.base_url = f"https://api.telegram.org/bot{token}"
-        self.sent_items: Set[str] = set()
+        self.sent_items = SentItemsStore()
         self.vinted_base_url = f"https://www.vinted{country_code}"
-    
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._client = None
+        self._global_bucket = TokenBucket(rate=30, capacity=30)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+
+    async def _throttle(self, chat_id: str):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate=20 / 60, capacity=20)
+        await self._global_bucket.acquire()
+        await bucket.acquire()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            timeout = aiohttp.ClientTimeout(total=15)
+            connector = aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=75)
+            self._session = aiohttp.ClientSession(timeout=timeout, connector=connector, json_serialize=_json_dumps)
+        return self._session
+
+    async def _get_client(self) -> 'httpx.AsyncClient':
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=15,
+                limits=httpx.Limits(max_connections=10)
+            )
+        return self._client
+
+    async def _post(self, url: str, data: Dict) -> Tuple[int, str]:
+        if httpx is not None:
+            client = await self._get_client()
+            response = await client.post(url, content=_json_dumps(data).encode(),
+                                         headers={'Content-Type': 'application/json'})
+            return response.status_code, response.text
+
+        session = await self._get_session()
+        async with session.post(url, json=data) as response:
+            return response.status, await response.text()
+
+    async def aclose(self):
+        if self._client and not self._client.is_closed:
+            await self._client.aclose()
+        if self._session and not self._session.closed:
+            await self._session.close()
+        await asyncio.to_thread(self.sent_items.close)
+
     async def send_message(self, chat_id: str, text: str, parse_mode: str = "HTML"):
         url = f"{self.base_url}/sendMessage"
         data = {
@@ -345,77 +513,102 @@ class TelegramNotifier:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=data) as response:
-                    if response.status == 200:
-                        logger.debug(f"Message sent successfully to chat {chat_id}")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Failed to send message: {response.status} - {error_text}")
-                        return False
+            await self._throttle(chat_id)
+            status, body = await self._post(url, data)
+            if status == 200:
+                logger.debug(f"Message sent successfully to chat {chat_id}")
+                return True
+            else:
+                logger.error(f"Failed to send message: {status} - {body}")
+                return False
         except Exception as e:
             logger.error(f"Telegram API error: {e}")
             return False
-    
+
+    async def send_media_group(self, chat_id: str, items: List[Dict]):
+        url = f"{self.base_url}/sendMediaGroup"
+        media = []
+        for item in items:
+            photos = item.get('photos', [])
+            media.append({
+                'type': 'photo',
+                'media': photos[0].get('url'),
+                'caption': self.format_item(item),
+                'parse_mode': 'HTML'
+            })
+        data = {'chat_id': chat_id, 'media': media}
+
+        try:
+            await self._throttle(chat_id)
+            status, body = await self._post(url, data)
+            if status == 200:
+                logger.debug(f"Media group of {len(media)} items sent to chat {chat_id}")
+                return True
+            else:
+                logger.error(f"Failed to send media group: {status} - {body}")
+                return False
+        except Exception as e:
+            logger.error(f"Telegram API error: {e}")
+            return False
+
     def format_item(self, item: Dict) -> str:
-        title = item.get('title', 'Unknown')
-        item_id = item.get('id', '')
-        url = f"{self.vinted_base_url}/items/{item_id}"
-        
         price_info = item.get('price', {})
-        currency_code = price_info.get('currency_code', 'EUR')
-        amount = price_info.get('amount', 'N/A')
-        
-        size = item.get('size_title', 'N/A')
-        brand = item.get('brand_title', 'N/A')
-        condition = item.get('status', 'N/A')
-        user_login = item.get('user', {}).get('login', 'N/A')
-        
         photos = item.get('photos', [])
-        photo_url = photos[0].get('url') if photos else None
-        
-        message = f"<b>{title}</b>\n"
-        message += f"💰 Price: {amount} {currency_code}\n"
-        message += f"📏 Size: {size}\n"
-        message += f"🏷️ Brand: {brand}\n"
-        message += f"⚡ Condition: {condition}\n"
-        message += f"👤 Seller: {user_login}\n"
-        message += f"🔗 <a href='{url}'>View Item</a>\n"
-        
-        if photo_url:
-            message += f"📸 <a href='{photo_url}'>Photo</a>\n"
-        
-        return message
-    
-    def generate_item_hash(self, item: Dict) -> str:
-        unique_string = f"{item.get('id', '')}-{item.get('title', '')}-{item.get('price', {}).get('amount', 0)}"
-        return hashlib.md5(unique_string.encode()).hexdigest()
+
+        return _format_item_message(
+            item.get('id', ''),
+            item.get('title', 'Unknown'),
+            price_info.get('amount', 'N/A'),
+            price_info.get('currency_code', 'EUR'),
+            item.get('size_title', 'N/A'),
+            item.get('brand_title', 'N/A'),
+            item.get('status', 'N/A'),
+            item.get('user', {}).get('login', 'N/A'),
+            photos[0].get('url') if photos else None,
+            self.vinted_base_url
+        )
     
     async def notify_new_items(self, items: List[Dict], chat_id: str):
-        new_items = []
-        
-        for item in items:
-            item_hash = self.generate_item_hash(item)
-            if item_hash not in self.sent_items:
-                new_items.append(item)
-                self.sent_items.add(item_hash)
+        item_ids = [item.get('id') for item in items if item.get('id') is not None]
+        new_ids = await asyncio.to_thread(self.sent_items.filter_new, item_ids)
+        new_items = [item for item in items if item.get('id') in new_ids]
+        await asyncio.sleep(0)
         
         if not new_items:
             logger.debug("No new items to send")
             return
         
         logger.info(f"Sending {len(new_items)} new items to chat {chat_id}")
-        
-        for item in new_items:
-            message = self.format_item(item)
-            success = await self.send_message(chat_id, message)
-            if success:
-                logger.debug(f"Sent notification for item: {item.get('title', 'Unknown')}")
-            else:
-                logger.error(f"Failed to send notification for item: {item.get('title', 'Unknown')}")
-            
-            await asyncio.sleep(1)
+
+        with_photos = [item for item in new_items if item.get('photos')]
+        without_photos = [item for item in new_items if not item.get('photos')]
+
+        chunks = [with_photos[i:i + 10] for i in range(0, len(with_photos), 10)]
+
+        semaphore = asyncio.Semaphore(5)
+
+        async def send_chunk(chunk: List[Dict]):
+            async with semaphore:
+                if len(chunk) >= 2:
+                    return await self.send_media_group(chat_id, chunk)
+                return await self.send_message(chat_id, self.format_item(chunk[0]))
+
+        async def send_one(item: Dict):
+            async with semaphore:
+                return await self.send_message(chat_id, self.format_item(item))
+
+        tasks = [send_chunk(chunk) for chunk in chunks]
+        tasks += [send_one(item) for item in without_photos]
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        sent = sum(1 for result in results if result is True)
+        if sent < len(tasks):
+            logger.error(f"Failed to send {len(tasks) - sent}/{len(tasks)} notifications to chat {chat_id}")
+        else:
+            logger.debug(f"Sent {sent} notifications to chat {chat_id}")
+
+async def ainput(prompt: str = '') -> str:
+    return await asyncio.get_running_loop().run_in_executor(None, input, prompt)
 
 class VintedBot:
     def __init__(self, config_path: str = 'config.json'):
@@ -434,6 +627,8 @@ class VintedBot:
         
         self.running = False
         self.check_interval = 50
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
     
     def load_config(self) -> Dict:
         try:
@@ -495,26 +690,43 @@ class VintedBot:
         
         return config
     
+    def _search_from_config(self, search_data: Dict) -> SearchConfig:
+        category = search_data.get('category', 'Clothing')
+        return SearchConfig(
+            chat_id=search_data.get('chat_id'),
+            name=f"Search: {search_data.get('query', 'Unknown')}",
+            filters=SearchFilters(
+                query=search_data.get('query', ''),
+                sizes=search_data.get('size_titles', []),
+                gender=search_data.get('gender') if category == 'Clothing' else None,
+                category=category
+            )
+        )
+
     def load_searches(self):
-        if 'searches' in self.config and self.config['searches']:
-            for search_data in self.config['searches']:
-                search_config = SearchConfig(
-                    chat_id=search_data.get('chat_id'),
-                    name=f"Search: {search_data.get('query', 'Unknown')}",
-                    filters=SearchFilters(
-                        query=search_data.get('query', ''),
-                        sizes=search_data.get('size_titles', []),
-                        gender=search_data.get('gender') if search_data.get('category', 'Clothing') == 'Clothing' else None,
-                        category=search_data.get('category', 'Clothing')
-                    )
-                )
-                self.searches.append(search_config)
-            
+        if self.config.get('searches'):
+            self.searches = [self._search_from_config(search_data) for search_data in self.config['searches']]
             logger.info(f"Loaded {len(self.searches)} searches from config.json")
         else:
             print("\nNo searches found in config.json. Let's create one!")
     
-    def save_searches(self):
+    def _write_config(self):
+        tmp_path = f"{self.config_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.config, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.config_path)
+
+    async def _flush_config(self):
+        if self._dirty:
+            await asyncio.to_thread(self._write_config)
+            self._dirty = False
+
+    async def _config_flusher(self):
+        while self.running:
+            await asyncio.sleep(5)
+            await self._flush_config()
+
+    async def save_searches(self):
         searches_data = []
         for search in self.searches:
             search_dict = {
@@ -526,15 +738,10 @@ class VintedBot:
             if search.filters.category == "Clothing" and search.filters.gender:
                 search_dict["gender"] = search.filters.gender
             searches_data.append(search_dict)
-        
+
         self.config['searches'] = searches_data
-        
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2, ensure_ascii=False)
-    
-    def generate_item_hash(self, item: Dict) -> str:
-        unique_string = f"{item.get('id', '')}-{item.get('title', '')}-{item.get('price', {}).get('amount', 0)}"
-        return hashlib.md5(unique_string.encode()).hexdigest()
+        self._dirty = True
+        await self._flush_config()
     
     async def process_search(self, search_config: SearchConfig):
         if not search_config.enabled:
@@ -561,11 +768,14 @@ class VintedBot:
         if not self.searches:
             print("\n❌ No searches configured! Please add at least one search before starting monitoring.")
             print("💡 Go back to the menu and select '1. Add new search' first.")
-            input("\nPress Enter to return to menu...")
+            await ainput("\nPress Enter to return to menu...")
             return
         
         logger.info(f"Monitoring {len(self.searches)} searches every {self.check_interval} seconds")
-        
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._config_flusher())
+
         while self.running:
             try:
                 start_time = time.time()
@@ -587,7 +797,11 @@ class VintedBot:
     async def stop(self):
         logger.info("Stopping bot...")
         self.running = False
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self._flush_config()
         await self.session_manager.close()
+        await self.notifier.aclose()
         logger.info("Bot stopped")
     
     def display_current_searches(self):
@@ -611,14 +825,14 @@ class VintedBot:
             print(f"   🔢 Items found: {search.items_found}")
             print()
     
-    def create_search_config(self) -> Optional[SearchConfig]:
+    async def create_search_config(self) -> Optional[SearchConfig]:
         print("\n➕ Creating new search:")
         print("-" * 30)
-        
+
         print("📦 Select category:")
         print("1. Clothing")
         print("2. Other")
-        category_choice = input("Choose (1-2): ").strip()
+        category_choice = (await ainput("Choose (1-2): ")).strip()
         
         if category_choice == '1':
             category = 'Clothing'
@@ -628,12 +842,12 @@ class VintedBot:
             print("Invalid choice, defaulting to Clothing")
             category = 'Clothing'
         
-        query = input("\n🔍 Search query (e.g., 'ralph lauren'): ").strip()
+        query = (await ainput("\n🔍 Search query (e.g., 'ralph lauren'): ")).strip()
         if not query:
             print("Query cannot be empty!")
             return None
-        
-        chat_id = input("💬 Telegram Chat ID: ").strip()
+
+        chat_id = (await ainput("💬 Telegram Chat ID: ")).strip()
         if not chat_id:
             print("Chat ID cannot be empty!")
             return None
@@ -642,13 +856,13 @@ class VintedBot:
         gender = None
         
         if category == 'Clothing':
-            sizes_input = input("📏 Sizes (comma-separated, e.g., 'S,M,L' or press Enter for any): ").strip()
+            sizes_input = (await ainput("📏 Sizes (comma-separated, e.g., 'S,M,L' or press Enter for any): ")).strip()
             sizes = [size.strip().upper() for size in sizes_input.split(',') if size.strip()] if sizes_input else []
             
             print("\n👔 Select gender:")
             print("1. Men")
             print("2. Women")
-            gender_choice = input("Choose (1-2): ").strip()
+            gender_choice = (await ainput("Choose (1-2): ")).strip()
             
             if gender_choice == '1':
                 gender = 'Men'
@@ -673,25 +887,25 @@ class VintedBot:
         
         return search_config
     
-    def remove_search(self):
+    async def remove_search(self):
         if not self.searches:
             print("\nNo searches to remove")
             return
-        
+
         self.display_current_searches()
-        
+
         try:
-            choice = int(input(f"\nEnter search number to remove (1-{len(self.searches)}): "))
+            choice = int(await ainput(f"\nEnter search number to remove (1-{len(self.searches)}): "))
             if 1 <= choice <= len(self.searches):
                 removed = self.searches.pop(choice - 1)
-                self.save_searches()
+                await self.save_searches()
                 print(f"✅ Removed search: {removed.name}")
             else:
                 print("Invalid choice")
         except ValueError:
             print("Invalid input")
     
-    def setup_country_code(self):
+    async def setup_country_code(self):
         current = self.config.get('country_code', '.hu')
         print(f"\n🌍 Current country: {current}")
         print("\nAvailable countries:")
@@ -701,12 +915,12 @@ class VintedBot:
         print("🇬🇧 .com - UK/International")
         print("🇪🇸 .es - Spain")
         
-        new_code = input("\nEnter new country code (or press Enter to keep current): ").strip()
-        
+        new_code = (await ainput("\nEnter new country code (or press Enter to keep current): ")).strip()
+
         if new_code and new_code in ['.hu', '.de', '.fr', '.com', '.es']:
             self.config['country_code'] = new_code
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            self._dirty = True
+            await self._flush_config()
             print(f"✅ Country code updated to: {new_code}")
             print("⚠️  Please restart the bot for changes to take effect!")
         elif new_code:
@@ -726,18 +940,18 @@ class VintedBot:
             print("4. 🚀 Start monitoring")
             print("5. 🚪 Exit")
             
-            choice = input("\nChoose option (1-5): ").strip()
-            
+            choice = (await ainput("\nChoose option (1-5): ")).strip()
+
             if choice == '1':
-                search = self.create_search_config()
+                search = await self.create_search_config()
                 if search:
                     self.searches.append(search)
-                    self.save_searches()
+                    await self.save_searches()
                     print("✅ Search added successfully!")
             elif choice == '2':
-                self.remove_search()
+                await self.remove_search()
             elif choice == '3':
-                self.setup_country_code()
+                await self.setup_country_code()
             elif choice == '4':
                 if not self.searches:
                     print("\n❌ No searches configured!")
@@ -779,4 +993,11 @@ async def main():
         await bot.stop()
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.debug("Using uvloop event loop")
+    except ImportError:
+        logger.debug("uvloop not available, using default event loop")
+
     asyncio.run(main())